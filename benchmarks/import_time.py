@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+
+"""Import-time regression guard for the command line entry point.
+
+Runs `ecbdatahandler --help` under `python -X importtime` and fails if it
+imports any of the heavy dependencies. Timings vary too much between
+machines for a fixed limit, so the cumulative import time is only checked
+against a budget (in milliseconds) when one is given.
+
+    python benchmarks/import_time.py [budget_ms]
+"""
+
+import os
+import re
+import sys
+import subprocess
+
+HEAVY_MODULES = [
+    'pandas', 'numpy', 'sqlalchemy', 'tqdm', 'tabulate', 'xlrd',
+    'xlsxwriter', 'pymysql'
+]
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_times(argv):
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime',
+         os.path.join(ROOT, 'bin', 'ecbdatahandler')] + argv,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        env=dict(os.environ, PYTHONPATH=ROOT)
+    )
+
+    times = {}
+    for line in result.stderr.splitlines():
+        match = re.match(r'import time:\s+\d+ \|\s+(\d+) \| (\s*)(\S+)', line)
+        if match and not match.group(2):
+            times[match.group(3)] = int(match.group(1))
+    return times
+
+
+def main():
+    budget = float(sys.argv[1]) if len(sys.argv) > 1 else None
+
+    times = import_times(['--help'])
+    total = sum(times.values()) / 1000.0
+    heavy = sorted(
+        module for module in times if module.split('.')[0] in HEAVY_MODULES
+    )
+
+    print('Cumulative import time: {:.1f} ms{}'.format(
+        total, ' (budget {:.1f} ms)'.format(budget) if budget else ''
+    ))
+    if heavy:
+        print('Heavy modules imported: {}'.format(', '.join(heavy)))
+
+    if heavy or (budget and total > budget):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
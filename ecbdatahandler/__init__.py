@@ -1,2 +1,22 @@
-from ecbdatahandler.ecbtosql import ECBtoSQL
-from ecbdatahandler.mount import MountSQL
+import importlib
+
+from ecbdatahandler import datahandlers
+
+# ECBtoSQL and MountSQL pull in pandas, sqlalchemy and friends, so they are
+# only imported on first access (PEP 562), like the handlers
+_lazy = {
+    'ECBtoSQL': 'ecbdatahandler.ecbtosql',
+    'MountSQL': 'ecbdatahandler.mount',
+}
+
+__all__ = list(_lazy) + datahandlers.__all__
+
+
+def __getattr__(name):
+    if name in _lazy:
+        return getattr(importlib.import_module(_lazy[name]), name)
+    if name in datahandlers.__all__:
+        return getattr(datahandlers, name)
+    raise AttributeError(
+        "module {!r} has no attribute {!r}".format(__name__, name)
+    )
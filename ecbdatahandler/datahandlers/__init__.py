@@ -1,2 +1,18 @@
-from ecbdatahandler.datahandlers.exceldatahandlers import MedicaoExcel, CombustivelExcel
-from ecbdatahandler.datahandlers.sqldatahandlers import MedicaoSQL, CombustivelSQL
+import importlib
+
+_lazy = {
+    'MedicaoExcel': 'ecbdatahandler.datahandlers.exceldatahandlers',
+    'CombustivelExcel': 'ecbdatahandler.datahandlers.exceldatahandlers',
+    'MedicaoSQL': 'ecbdatahandler.datahandlers.sqldatahandlers',
+    'CombustivelSQL': 'ecbdatahandler.datahandlers.sqldatahandlers',
+}
+
+__all__ = list(_lazy)
+
+
+def __getattr__(name):
+    if name not in _lazy:
+        raise AttributeError(
+            "module {!r} has no attribute {!r}".format(__name__, name)
+        )
+    return getattr(importlib.import_module(_lazy[name]), name)
@@ -3,8 +3,38 @@
 from abc import ABC, abstractmethod
 
 import pandas as pd
+import sqlalchemy
 
-from ecbdatahandler.helpers import fix_placa, date_to_str, to_sql_string
+from ecbdatahandler.helpers import fix_placa, to_sql_string
+from ecbdatahandler.policies import Policies
+
+
+# serials 1 to 2958465, 1899-12-31 to 9999-12-31 with origin 1899-12-30
+EXCEL_SERIAL_RANGE = (1, 2958465)
+
+
+def parse_dates(values, date_format=None):
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+
+    # numbers are Excel serial dates (days since 1899-12-30)
+    serials = pd.to_numeric(values, errors='coerce')
+    is_serial = serials.notnull()
+
+    parsed = pd.to_datetime(
+        values.where(~is_serial),
+        format=date_format,
+        infer_datetime_format=date_format is None,
+        errors='coerce'
+    )
+    # anything outside Excel's own date range (e.g. 20200615) is coerced
+    serials = serials.where(serials.between(*EXCEL_SERIAL_RANGE))
+    return parsed.where(
+        ~is_serial,
+        pd.to_datetime(
+            serials, unit='D', origin='1899-12-30', errors='coerce'
+        )
+    )
 
 
 class ExcelDataHandlerABC(ABC):
@@ -36,25 +66,62 @@ class ExcelDataHandlerABC(ABC):
     def prepare(self, config):
         pass
 
-    def to_sql(self, engine):
+    def _prepare_dates(self, config):
+        parsed = parse_dates(self.df['data'], config.get('date_format'))
+
+        coerced = parsed.isnull() & self.df['data'].notnull()
+        # bounds check instead of membership in a materialized date range,
+        # end_date is inclusive whatever the time of day
+        in_period = (parsed >= config['start_date']) & \
+            (parsed < config['end_date'] + pd.Timedelta(days=1))
+        outside = parsed.notnull() & ~in_period
+
+        if coerced.any() or outside.any():
+            print(
+                'Warning: dropped {0} rows with unparseable dates and {1} '
+                'rows outside the period from table {2}.'.format(
+                    coerced.sum(), outside.sum(), self.tablename
+                )
+            )
+
+        self.df['data'] = parsed.values
+        self.df = self.df.loc[in_period.values]
+        self.df = self.df.sort_values(by='data')
+        self.df['data'] = self.df['data'].dt.strftime('%Y-%m-%d')
+
+    def to_sql(self, engine, policies=None):
         conditions = ' AND '.join(
             "{0} = '{1}'".format(t, v) for t, v in self.tags.items()
         )
+        deleted = False
         try:
             engine.execute('DELETE FROM {0} WHERE {1}'.format(
                 self.tablename, conditions
             ))
+            deleted = True
 
             # delete columns not in database
             self.load_sql(engine)
             self.df = self.df[[col for col in self._sql_df.columns if col in self.df.columns]]
 
         except Exception as e:
-            cont = input(
-                'Received the following error: \n\n{0}\n\nContinue? '.format(e)
-            )
-            if cont not in ['Y', 'y', 'yes']:
-                exit()
+            policies = policies or Policies()
+            action, _ = policies.action('sql_error')
+            message = 'Received the following error: \n\n{0}\n'.format(e)
+
+            if action == 'prompt':
+                policies.confirm(message)
+            elif action == 'fail':
+                policies.fail(message)
+            elif action == 'skip':
+                print(message)
+                return
+            elif action == 'defer':
+                policies.defer('sql_error', e, self.tablename)
+                # rows of the period may still be there, don't duplicate them
+                if not deleted and self.tablename in \
+                        sqlalchemy.inspect(engine).get_table_names():
+                    return
 
         self.df.to_sql(
             self.tablename,
@@ -70,14 +137,9 @@ class MedicaoExcel(ExcelDataHandlerABC):
         rename_map = {col: to_sql_string(col) for col in self.df.columns.values}
         self.df = self.df.rename(columns=rename_map)
 
-        self.df['data'] = pd.to_datetime(self.df['data'], errors='coerce')
-        # self.df = self.df.set_index('data', drop=False)
-        # self.df = self.df.sort_index()
-        self.df = self.df.loc[self.df['data'].isin(config['daterange'])]
-        self.df = self.df.sort_values(by='data')
+        self._prepare_dates(config)
 
         # self.df['placa'] = self.df['placa'].apply(fix_placa)
-        self.df['data'] = self.df['data'].apply(date_to_str)
 
 
 class CombustivelExcel(ExcelDataHandlerABC):
@@ -86,8 +148,6 @@ class CombustivelExcel(ExcelDataHandlerABC):
         rename_map = {col: to_sql_string(col) for col in self.df.columns}
         self.df = self.df.rename(columns=rename_map)
 
-        self.df = self.df.set_index('data', drop=False)
-        self.df = self.df.sort_index()
+        self._prepare_dates(config)
 
         self.df['placa'] = self.df['placa'].apply(fix_placa)
-        self.df['data'] = self.df['data'].apply(date_to_str)
@@ -1,12 +1,11 @@
 #!/usr/bin/env python
 
-import sys
-
 from abc import ABC, abstractmethod
 
 import pandas as pd
+import sqlalchemy
 
-from ecbdatahandler.helpers import prompt_yes_no
+from ecbdatahandler.policies import Policies
 
 
 class SQLDataHandlerABC(ABC):
@@ -15,22 +14,120 @@ class SQLDataHandlerABC(ABC):
         self.table = table
         self.filters = filters
 
-    def load(self, engine):
-        conditions = ' AND '.join(
-            "{0} = '{1}'".format(t, v) for t, v in self.filters.items()
-        )
-        self._df = pd.read_sql_query(
-            'SELECT * FROM {0} WHERE {1}'.format(self.table, conditions),
-            engine
+    def _conditions(self, partition=None):
+        # values are bound, so quotes in a placa can't break the query
+        filters = dict(self.filters, **(partition or {}))
+        conditions, params = [], {}
+        for column, value in filters.items():
+            values = value if isinstance(value, (list, set, tuple)) \
+                else [value]
+            names = []
+            for x in values:
+                names.append('p{}'.format(len(params)))
+                params[names[-1]] = x
+            conditions.append('{0} IN ({1})'.format(
+                column, ', '.join(':' + name for name in names)
+            ))
+        return ' AND '.join(conditions), params
+
+    def query(self, partition=None, columns='*', not_null=()):
+        """Return the (sql, params) selecting this table's rows."""
+        conditions, params = self._conditions(partition)
+        return 'SELECT {0} FROM {1} WHERE {2}'.format(
+            columns,
+            self.table,
+            ' AND '.join(
+                [conditions] +
+                ['{} IS NOT NULL'.format(col) for col in not_null]
+            )
+        ), params
+
+    def _read(self, engine, query, **kwargs):
+        sql, params = query
+        return pd.read_sql_query(
+            sqlalchemy.text(sql), engine, params=params, **kwargs
         )
 
+    def load(self, engine, partition=None):
+        self._df = self._read(engine, self.query(partition))
+
+    def load_chunks(self, engine, chunksize):
+        # the handler frame holds one chunk at a time, and a server-side
+        # cursor keeps the driver from buffering the whole result first
+        with engine.connect() as connection:
+            connection = connection.execution_options(stream_results=True)
+            for chunk in self._read(
+                connection, self.query(), chunksize=chunksize
+            ):
+                self._df = chunk
+                yield
+
+    def load_distinct(self, engine, columns, not_null=()):
+        return self._read(engine, self.query(
+            columns='DISTINCT ' + ', '.join(columns), not_null=not_null
+        ))
+
     @abstractmethod
-    def prepare(self, config, packs):
+    def prepare(self, config, price_index, policies=None):
         pass
 
+    def _report_unpriced(self, unpriced, config, policies):
+        policies = policies or Policies()
+        action, value = policies.action('unpriced')
+        message = ''.join([
+            'The following {0} did not have their price updated:\n'.format(
+                self.label
+            ),
+            '\n\t{0}\n\n'.format('\n\t'.join(unpriced)),
+            'In the handling of table {0}.'.format(config['table'])
+        ])
+
+        if action == 'prompt':
+            policies.confirm(
+                message, [(config['table'], item) for item in unpriced]
+            )
+        elif action == 'fail':
+            policies.fail(message)
+        elif action == 'defer':
+            for item in unpriced:
+                policies.defer('unpriced', item, config['table'])
+
+        return action, value
+
+    def _resolve_unpriced(self, unpriced, rows, config, policies):
+        if not unpriced:
+            return
+
+        action, value = self._report_unpriced(unpriced, config, policies)
+        if action == 'skip':
+            self._df = self._df.loc[~rows]
+        elif action == 'default':
+            self._df.loc[rows, self.price_column] = float(value)
+
+    def check_prices(self, engine, config, price_index, policies=None):
+        """Report the unpriced items of the whole table up front.
+
+        Lets a partitioned load prompt once per item instead of once per
+        partition.
+        """
+        pairs = self.load_distinct(
+            engine,
+            [self.item_column, self.price_column],
+            not_null=config['not_null'].split(', ')
+        )
+        _, unpriced, _ = price_index.resolve(
+            pairs[self.item_column], pairs[self.price_column]
+        )
+        if unpriced:
+            self._report_unpriced(unpriced, config, policies)
+
+    def release(self):
+        self._df = pd.DataFrame()
+
     @property
     def dataframe(self):
-        return self._df.copy()
+        # no copy: callers must treat the returned frame as read-only
+        return self._df
 
     @dataframe.setter
     def dataframe(self, value):
@@ -39,10 +136,19 @@ class SQLDataHandlerABC(ABC):
 
 class MedicaoSQL(SQLDataHandlerABC):
 
+    item_column = 'material'
+    price_column = 'valor_ton'
+    total_column = 'valor_total'
+    label = 'materiais'
+    # columns added or converted by prepare, as ParquetExporter type names
+    computed_columns = {
+        'data': 'timestamp', 'valor_ton': 'double', 'valor_total': 'double'
+    }
+
     def __init__(self, table, filters):
         super().__init__(table, filters)
 
-    def prepare(self, config, packs):
+    def prepare(self, config, price_index, policies=None):
         for column in config['not_null'].split(', '):
             self._df = self._df.loc[self._df[column].notnull()]
 
@@ -52,34 +158,11 @@ class MedicaoSQL(SQLDataHandlerABC):
 
         self._df['data'] = pd.to_datetime(self._df['data'])
 
-        materiais = set(self._df['material'])
-
-        for pack, price in config['price'].items():
-            self._df.loc[
-                self._df['material'].isin(packs[pack]), 'valor_ton'] = price
-            materiais.difference_update(set(packs[pack]))
-
-        if None in materiais:
-            price_map = {
-                float(k): float(v) for k, v in config['null_price_map'].items()
-            }
-            self._df.loc[self._df['material'].isnull(), self.price_column] = \
-                self._df.loc[
-                    self._df['material'].isnull(), self.price_column
-                ].map(price_map)
-            materiais.discard(None)
-
-        if materiais:
-            print(
-                'The following materiais did not have their price updated:\n',
-                '\n\t{0}\n\n'.format('\n\t'.join(materiais)),
-                'In the handling of table {0}.'.format(config['table']),
-                sep=''
-            )
-            cont = prompt_yes_no('Continue?', default='no')
-            if not cont:
-                sys.exit(1)
-            print('')
+        self._df['valor_ton'], materiais, rows = price_index.resolve(
+            self._df['material'], self._df['valor_ton']
+        )
+
+        self._resolve_unpriced(materiais, rows, config, policies)
 
         self._df['valor_total'] = (
             pd.to_numeric(self._df['cap']) *
@@ -91,7 +174,15 @@ class MedicaoSQL(SQLDataHandlerABC):
 
 class CombustivelSQL(SQLDataHandlerABC):
 
-    def prepare(self, config, packs):
+    item_column = 'tipo_de_combustivel'
+    price_column = 'preco'
+    total_column = 'total'
+    label = 'combustiveis'
+    computed_columns = {
+        'data': 'timestamp', 'preco': 'double', 'total': 'double'
+    }
+
+    def prepare(self, config, price_index, policies=None):
         for column in config['not_null'].split(', '):
             self._df = self._df.loc[self._df[column].notnull()]
 
@@ -101,25 +192,11 @@ class CombustivelSQL(SQLDataHandlerABC):
 
         self._df['data'] = pd.to_datetime(self._df['data'])
 
-        combustiveis = set(self._df['tipo_de_combustivel'])
-
-        for pack, price in config['price'].items():
-            self._df.loc[
-                self._df['tipo_de_combustivel'].isin(packs[pack]),
-                'preco'
-            ] = price
-            combustiveis.difference_update(set(packs[pack]))
-
-        if combustiveis:
-            print(
-                'The following combustiveis did not have their price updated:',
-                '\n\t{0}\n'.format('\n\t'.join(combustiveis)),
-                'In the handling of table {0}.'.format(config['table']),
-                sep=''
-            )
-            cont = prompt_yes_no('Continue?', default='no')
-            if not cont:
-                sys.exit(1)
+        self._df['preco'], combustiveis, rows = price_index.resolve(
+            self._df['tipo_de_combustivel'], self._df['preco']
+        )
+
+        self._resolve_unpriced(combustiveis, rows, config, policies)
 
         self._df['total'] = (
             pd.to_numeric(self._df['qtd']) *
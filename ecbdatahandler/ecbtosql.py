@@ -1,6 +1,8 @@
 #!/usr/bin/env python
 
 from ecbdatahandler.datahandlers import MedicaoExcel, CombustivelExcel
+from ecbdatahandler.indexes import ensure_indexes, MODES as INDEX_MODES
+from ecbdatahandler.policies import Policies
 
 import os
 import configparser
@@ -21,21 +23,31 @@ class ECBtoSQL:
             return config.get(section, option, fallback='').split(', ')
 
         self.names = get_config_split('general', 'names')
+        self.index_mode = config.get('general', 'indexes', fallback='create')
+        if self.index_mode not in INDEX_MODES:
+            raise ValueError(
+                "invalid index mode: '{}'".format(self.index_mode)
+            )
 
-        self.start_date = config.get('global_filters', 'start_date')
-        self.end_date = config.get('global_filters', 'end_date')
-        self.daterange = pd.date_range(self.start_date, self.end_date)
+        self.start_date = pd.Timestamp(
+            config.get('global_filters', 'start_date')
+        )
+        self.end_date = pd.Timestamp(config.get('global_filters', 'end_date'))
 
         self.tags = dict(config['global_tags'])
 
         self.mysql = dict(config['mysql'])
+        self.policies = Policies(
+            dict(config['policies']) if config.has_section('policies') else {}
+        )
 
         self.data_config = {}
         self.data_handlers = {}
 
         for name in self.names:
             name_config = dict(config[name])
-            name_config['daterange'] = self.daterange
+            name_config['start_date'] = self.start_date
+            name_config['end_date'] = self.end_date
             name_type = {
                 'medicao': MedicaoExcel,
                 'combustivel': CombustivelExcel
@@ -63,4 +75,8 @@ class ECBtoSQL:
             )
         )
         for data_wrapper in self.data_handlers.values():
-            data_wrapper.to_sql(engine)
+            data_wrapper.to_sql(engine, policies=self.policies)
+            ensure_indexes(
+                engine, data_wrapper.tablename, list(self.tags),
+                mode=self.index_mode
+            )
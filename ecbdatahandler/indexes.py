@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+
+import sqlalchemy
+import pandas as pd
+
+
+# columns, besides the tags/filters, that partition the queries
+PARTITION_COLUMNS = ['placa', 'cacamba_no']
+
+MODES = ('create', 'recommend', 'off')
+
+# MySQL can only index TEXT columns (what to_sql creates) by a prefix
+TEXT_PREFIX_LENGTH = 32
+
+
+def wanted_indexes(columns, leading_columns, partition_columns=None):
+    """Composite indexes a table needs, as tuples of column names.
+
+    The leading columns (tags or filters) come first, so each index also
+    serves the queries filtering on the leading columns alone. Without
+    partition_columns, PARTITION_COLUMNS is used.
+    """
+    leading = tuple(col for col in leading_columns if col in columns)
+    if not leading:
+        return []
+
+    if partition_columns is None:
+        partition_columns = PARTITION_COLUMNS
+
+    wanted = [leading + (col,) for col in partition_columns if col in columns]
+    return wanted or [leading]
+
+
+def missing_indexes(engine, tablename, leading_columns,
+                    partition_columns=None):
+    inspector = sqlalchemy.inspect(engine)
+    # e.g. to_sql skipped the table, there is nothing to index
+    if tablename not in inspector.get_table_names():
+        return []
+
+    columns = {col['name']: col for col in inspector.get_columns(tablename)}
+
+    existing = [
+        tuple(index['column_names'])
+        for index in inspector.get_indexes(tablename)
+    ]
+    existing += [
+        tuple(inspector.get_pk_constraint(tablename)['constrained_columns'])
+    ]
+
+    return [
+        (index, columns)
+        for index in wanted_indexes(
+            columns, leading_columns, partition_columns
+        )
+        if not any(other[:len(index)] == index for other in existing)
+    ]
+
+
+def create_index_statement(tablename, index, columns):
+    def key(col):
+        if isinstance(columns[col]['type'], sqlalchemy.types.Text):
+            return '{}({})'.format(col, TEXT_PREFIX_LENGTH)
+        return col
+
+    return 'CREATE INDEX {0} ON {1} ({2})'.format(
+        'ix_{}_{}'.format(tablename, '_'.join(index))[:64],
+        tablename,
+        ', '.join(key(col) for col in index)
+    )
+
+
+def ensure_indexes(engine, tablename, leading_columns, mode='create',
+                   partition_columns=None):
+    """Create (or only print) the indexes missing from tablename."""
+    if mode not in MODES:
+        raise ValueError("invalid index mode: '{}'".format(mode))
+
+    if mode == 'off':
+        return []
+
+    statements = [
+        create_index_statement(tablename, index, columns)
+        for index, columns in missing_indexes(
+            engine, tablename, leading_columns, partition_columns
+        )
+    ]
+
+    for statement in statements:
+        if mode == 'create':
+            engine.execute(statement)
+        else:
+            print('Recommended index: {};'.format(statement))
+
+    return statements
+
+
+def explain(engine, query, params=None):
+    return pd.read_sql_query(
+        sqlalchemy.text('EXPLAIN {}'.format(query)), engine, params=params
+    )
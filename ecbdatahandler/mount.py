@@ -7,16 +7,26 @@ import re
 from tqdm import tqdm
 from tabulate import tabulate
 
+import numpy as np
 import pandas as pd
 import pandas.io.formats.excel
-import numpy as np
 import sqlalchemy
 
 from ecbdatahandler.datahandlers import MedicaoSQL, CombustivelSQL
+from ecbdatahandler.pricing import PriceIndex
+from ecbdatahandler.placas import PlacaCAIndex
+from ecbdatahandler.indexes import ensure_indexes, explain, \
+    MODES as INDEX_MODES
+from ecbdatahandler.policies import Policies
+from ecbdatahandler.parquet import ParquetExporter
 from ecbdatahandler.helpers import to_sql_string, prompt_yes_no, silent, \
     date_to_str_pt
 
 
+# CA of the placas left unassigned by the unknown_placa policy
+UNASSIGNED_CA = 'SEM-CA'
+
+
 class CA:
 
     def __init__(
@@ -37,12 +47,12 @@ class CA:
         self.liquido = self.descontado - self.iss
 
     def export_sheet(self, output_folder, columns, widths):
-        medicao_df = self.medicao_df.copy()
-        medicao_df = medicao_df.sort_values(by=['data'])
+        # sort_values already returns a new frame, no defensive copy needed
+        medicao_df = self.medicao_df.sort_values(by=['data'])
         medicao_df['data'] = medicao_df['data'].apply(date_to_str_pt)
 
         rename_map = {to_sql_string(col): col for col in columns}
-        medicao_df = medicao_df.rename(columns=rename_map)
+        medicao_df = medicao_df.rename(columns=rename_map, copy=False)
         medicao_df = medicao_df[columns]
 
         filename = '{}/{}.xlsx'.format(output_folder, self.ca)
@@ -113,15 +123,19 @@ class CA:
                 self.total_carga_bruta
             ))
             if not self.combustivel_df.empty:
-                combustivel_df = self.combustivel_df.copy()
-                combustivel_df['data'] = combustivel_df['data'] \
-                    .apply(date_to_str_pt)
-
+                # only the listed columns are copied, not the whole frame
                 rename_map = {to_sql_string(col): col for col in columns}
-                combustivel_df = combustivel_df.rename(columns=rename_map)
+                combustivel_df = self.combustivel_df[list(rename_map)]
+                if 'data' in rename_map:
+                    combustivel_df = combustivel_df.assign(
+                        data=combustivel_df['data'].apply(date_to_str_pt)
+                    )
+                combustivel_df = combustivel_df.rename(
+                    columns=rename_map, copy=False
+                )
                 resumo.write(
                     tabulate(
-                        combustivel_df[columns],
+                        combustivel_df,
                         headers='keys',
                         tablefmt='pipe',
                         showindex='false'
@@ -170,13 +184,37 @@ class MountSQL:
 
         self.data_handlers = {}
         self.data_config = {}
+        self.price_indexes = {}
+        self._price_index_cache = {}
         self.ca_list = []
+        self._deferred_placas = {}
+        self.ca_stats = []
+        self.total = 0.0
+        self.total_combustivel = 0.0
         self.unproductive = pd.DataFrame()
 
         self.period_str = dict(config['general'])['period_str']
         self.observation_str = dict(config['general'])['observation_str']
         self.mysql = dict(config['mysql'])
+        self.policies = Policies(
+            dict(config['policies']) if config.has_section('policies') else {}
+        )
         self.global_filters = dict(config['global_filters'])
+        self.streaming = config.getboolean(
+            'general', 'streaming', fallback=False
+        )
+        self.chunksize = config.getint('general', 'chunksize', fallback=50000)
+        self.index_mode = config.get('general', 'indexes', fallback='create')
+        if self.index_mode not in INDEX_MODES:
+            raise ValueError(
+                "invalid index mode: '{}'".format(self.index_mode)
+            )
+        parquet_root = config.get('general', 'parquet', fallback='')
+        self.parquet = ParquetExporter(parquet_root, self.global_filters) \
+            if parquet_root else None
+        self.placa_ca_index = PlacaCAIndex(
+            config.get('general', 'placa_ca_table', fallback='placa_ca')
+        )
         self.packs = {
             pack: get_config_split('packs', pack) for pack in config['packs']
         }
@@ -199,6 +237,7 @@ class MountSQL:
             )
 
             self.data_config[name] = name_config
+            self.price_indexes[name] = self._price_index(name_config)
             self.data_handlers[name] = MedicaoSQL(
                 table=name_config['table'],
                 filters=self.global_filters
@@ -216,128 +255,243 @@ class MountSQL:
             )
 
             self.data_config[name] = name_config
+            self.price_indexes[name] = self._price_index(name_config)
             self.data_handlers[name] = CombustivelSQL(
                 table=name_config['table'], filters=self.global_filters
             )
 
-    def load(self):
-        engine = sqlalchemy.create_engine(
+    def _price_index(self, name_config):
+        # tables sharing the same prices share a single compiled index
+        key = (
+            tuple(name_config['price'].items()),
+            tuple(name_config['null_price_map'].items())
+        )
+        if key not in self._price_index_cache:
+            self._price_index_cache[key] = PriceIndex(
+                self.packs, name_config['price'], name_config['null_price_map']
+            )
+        return self._price_index_cache[key]
+
+    def _create_engine(self):
+        return sqlalchemy.create_engine(
             'mysql+pymysql://{user}:{password}@{server}/{database}'.format(
                 **self.mysql
             )
         )
+
+    def _source_column(self, name, column):
+        # column as named in the SQL table, before renaming
+        return {
+            v: k for k, v in self.data_config[name]['rename'].items()
+        }.get(column, column)
+
+    def _partition_columns(self, name):
+        # medicao is read per CA, combustivel per placa
+        if name in self.medicao_names:
+            return [self._source_column(name, 'ca')]
+        return ['placa']
+
+    def _ensure_indexes(self, engine, mode):
         for name, handler in self.data_handlers.items():
-            handler.load(engine)
-            handler.prepare(config=self.data_config[name], packs=self.packs)
+            ensure_indexes(
+                engine, handler.table, list(self.global_filters), mode=mode,
+                partition_columns=self._partition_columns(name)
+            )
 
-    def _aggregate(self):
-        self.medicao_df = pd.DataFrame()
+    def explain(self):
+        engine = self._create_engine()
 
-        for name in self.medicao_names:
-            config = self.data_config[name]
-            to_append_df = self.data_handlers[name].dataframe
+        for name, handler in self.data_handlers.items():
+            partition = {self._source_column(name, 'ca'): 'CA-0'} \
+                if name in self.medicao_names else {'placa': ['']}
+
+            print('# {}\n'.format(handler.table))
+            for query, params in [
+                handler.query(), handler.query(partition)
+            ]:
+                print(query, params)
+                print(tabulate(
+                    explain(engine, query, params),
+                    headers='keys',
+                    tablefmt='pipe',
+                    showindex=False
+                ))
+                print('')
 
-            to_append_df = to_append_df.rename(columns=config['rename'])
+            ensure_indexes(
+                engine, handler.table, list(self.global_filters),
+                mode='recommend',
+                partition_columns=self._partition_columns(name)
+            )
+            print('')
 
-            self.medicao_df = self.medicao_df.append(to_append_df)
+    def load(self):
+        engine = self._create_engine()
+        self.engine = engine
+        self.placa_ca_index.load(engine)
+        self._ensure_indexes(engine, self.index_mode)
 
-        self.combustivel_df = pd.DataFrame()
+        # in streaming mode rows are loaded one CA at a time by mount
+        if self.streaming:
+            return
 
-        for name in self.combustivel_names:
-            config = self.data_config[name]
-            to_append_df = self.data_handlers[name].dataframe
+        for name, handler in self.data_handlers.items():
+            handler.load(engine)
+            handler.prepare(
+                config=self.data_config[name],
+                price_index=self.price_indexes[name],
+                policies=self.policies
+            )
 
-            to_append_df = to_append_df.rename(columns=config['rename'])
+    def _concat_handlers(self, names):
+        # rename without copying, so the only copy is the one made by concat
+        frames = [
+            self.data_handlers[name].dataframe.rename(
+                columns=self.data_config[name]['rename'], copy=False
+            )
+            for name in names
+        ]
+        aggregated = pd.concat(frames, sort=False) if frames \
+            else pd.DataFrame()
 
-            self.combustivel_df = self.combustivel_df.append(to_append_df)
+        for name in names:
+            self.data_handlers[name].release()
 
-    def _split_ca_sem_combustivel(self):
-        medicao_cas = self.medicao_df.sort_values('cod1')['ca'].unique()
+        return aggregated
 
-        for ca in medicao_cas:
-            medicao = self.medicao_df.loc[self.medicao_df['ca'] == ca]
-            self.ca_list.append(CA(ca, medicao))
+    def _aggregate(self):
+        self.medicao_df = self._concat_handlers(self.medicao_names)
+        self.combustivel_df = self._concat_handlers(self.combustivel_names)
 
-    def _split_ca_com_combustivel(self):
-        medicao_cas = self.medicao_df.sort_values('ca')['ca'].unique()
+    def _sorted_slices(self, df, keys):
+        """Sort df by keys once and return it with each key's row range.
 
-        ca_placa_map = {}
+        Each CA then gets df.iloc[start:stop], a view instead of a
+        boolean-mask copy.
+        """
+        keys = pd.Series(np.asarray(keys, dtype=object))
+        # null keys are sorted last and left out of the slices
+        order = keys.sort_values(kind='mergesort').index.values
+        keys = keys.values[order]
+        keys = keys[:pd.notnull(keys).sum()]
 
-        medicao_placas = set()
-        combustivel_placas = self.combustivel_df['placa'].unique()
+        unique_keys = pd.unique(keys)
+        starts = np.searchsorted(keys, unique_keys, side='left')
+        stops = np.searchsorted(keys, unique_keys, side='right')
 
-        missing_medicao = sorted(
-            list(set(combustivel_placas).difference(medicao_placas))
+        return df.iloc[order], dict(zip(unique_keys, zip(starts, stops)))
+
+    def _split_ca_sem_combustivel(self):
+        self.medicao_df, medicao_slices = self._sorted_slices(
+            self.medicao_df, self.medicao_df['ca']
         )
 
-        # try to find CA in info's first string
-        if missing_medicao:
+        for ca, (start, stop) in medicao_slices.items():
+            self.ca_list.append(CA(
+                ca, self.period_str, self.observation_str,
+                self.medicao_df.iloc[start:stop]
+            ))
+
+    def _resolve_placas(self, placa_info_df, medicao_cas):
+        placa_ca_map, missing_ca = self.placa_ca_index.resolve(placa_info_df)
+
+        action, value = self.policies.action('unknown_placa')
+
+        if missing_ca and action == 'prompt':
             print('CAs with medicao: {}.\n'.format(', '.join(medicao_cas)))
 
-            # iterate over copy, because we're altering it
-            for placa in missing_medicao[:]:
-                info = '\n '.join(self.combustivel_df.loc[
-                    self.combustivel_df['placa'] == placa, 'prefixo_marca'
-                ].unique())
+        for placa in missing_ca:
+            info = '\n\t'.join(placa_info_df.loc[
+                placa_info_df['placa'] == placa, 'prefixo_marca'
+            ].astype(str).unique())
+            message = 'Unable to find medicao of the placa: {}.\n\n' \
+                'Info for {}:\n\t{}'.format(placa, placa, info)
+
+            if action == 'prompt':
+                print(message)
+                placa_ca_map[placa] = input('Enter CA: ')
+                self.placa_ca_index.confirm(placa, placa_ca_map[placa])
+                print('')
+            elif action == 'fail':
+                self.policies.fail(message)
+            elif action == 'default':
+                placa_ca_map[placa] = value
+            else:
+                # skip and defer keep the fuel in the unproductive report
+                placa_ca_map[placa] = UNASSIGNED_CA
+                if action == 'defer':
+                    self._deferred_placas[placa] = info
 
-                placa_ca = re.search('CA-\d+|$', info).group()
-                if not placa_ca:
-                    print(
-                        'Unable to find medicao of the placa: %s.\n' % placa
-                    )
-                    print('Info for {}:\n\t{}'.format(placa, info))
-                    placa_ca = input('Enter CA: ')
-                    print('')
-
-                if placa_ca in ca_placa_map:
-                    ca_placa_map[placa_ca].add(placa)
-                else:
-                    ca_placa_map[placa_ca] = set([placa])
-
-                if placa_ca in medicao_cas:
-                    missing_medicao.remove(placa)
-
-        reverse_ca_placa_map = {
-            placa: placa_ca
-            for placa_ca in ca_placa_map
-            for placa in ca_placa_map[placa_ca]
-        }
+        self.placa_ca_index.save(self.engine)
+
+        ca_placa_map = {}
+        for placa, placa_ca in placa_ca_map.items():
+            ca_placa_map.setdefault(placa_ca, set()).add(placa)
+
+        missing_medicao = sorted(
+            placa for placa, placa_ca in placa_ca_map.items()
+            if placa_ca not in medicao_cas
+        )
 
         if missing_medicao:
             print(
                 'Unable to find medicao of the following placas:\n\t{}.\n'
                 .format(', '.join(
-                    placa + ' (' + reverse_ca_placa_map[placa] + ')'
+                    placa + ' (' + placa_ca_map[placa] + ')'
                     for placa in missing_medicao
                 ))
             )
 
-        self.unproductive = pd.DataFrame(
+        return ca_placa_map, placa_ca_map, missing_medicao
+
+    def _defer_placas(self):
+        for placa, info in self._deferred_placas.items():
+            total = self.unproductive.loc[
+                self.unproductive['Placa'] == placa, 'Total'
+            ].sum()
+            self.policies.defer(
+                'unknown_placa', placa,
+                '{}; combustivel: R$ {:.2f}'.format(info, total)
+            )
+
+    def _unproductive(self, combustivel_df, placa_ca_map, missing_medicao):
+        placa_totals = combustivel_df.groupby('placa')['total'].sum() \
+            if not combustivel_df.empty else pd.Series(dtype=float)
+        return pd.DataFrame(
             [
-                (
-                    reverse_ca_placa_map[placa],
-                    placa,
-                    self.combustivel_df.loc[
-                        self.combustivel_df['placa'] == placa, 'total'
-                    ].sum()
-                )
+                (placa_ca_map[placa], placa, placa_totals.get(placa, 0.0))
                 for placa in missing_medicao
             ], columns=['CA', 'Placa', 'Total']
         )
 
-        for ca in medicao_cas:
-            ca_medicao = self.medicao_df.loc[
-                self.medicao_df['ca'] == ca
-            ]
-            ca_combustivel = self.combustivel_df.loc[
-                self.combustivel_df['placa'].isin(ca_placa_map[ca])
-            ] if ca in ca_placa_map else pd.DataFrame()
+    def _split_ca_com_combustivel(self):
+        medicao_cas = self.medicao_df.sort_values('ca')['ca'].unique()
+
+        ca_placa_map, placa_ca_map, missing_medicao = self._resolve_placas(
+            self.combustivel_df, medicao_cas
+        )
+        self.unproductive = self._unproductive(
+            self.combustivel_df, placa_ca_map, missing_medicao
+        )
+        self._defer_placas()
+
+        self.medicao_df, medicao_slices = self._sorted_slices(
+            self.medicao_df, self.medicao_df['ca']
+        )
+        self.combustivel_df, combustivel_slices = self._sorted_slices(
+            self.combustivel_df,
+            self.combustivel_df['placa'].map(placa_ca_map).fillna('')
+        )
 
-            if not ca_combustivel.empty:
+        for ca, (start, stop) in medicao_slices.items():
+            ca_medicao = self.medicao_df.iloc[start:stop]
+
+            if ca in combustivel_slices:
+                start, stop = combustivel_slices[ca]
                 self.ca_list.append(
                     CA(
                         ca, self.period_str, self.observation_str,
-                        ca_medicao, ca_combustivel
+                        ca_medicao, self.combustivel_df.iloc[start:stop]
                     )
                 )
             else:
@@ -345,14 +499,167 @@ class MountSQL:
                     CA(ca, self.period_str, self.observation_str, ca_medicao)
                 )
 
-    def mount(self):
-        self._aggregate()
+    def _load_partition(self, names, column, values):
+        for name in names:
+            source = self._source_column(name, column)
+
+            handler = self.data_handlers[name]
+            handler.load(self.engine, partition={source: values})
+            if not handler.dataframe.empty:
+                handler.prepare(
+                    config=self.data_config[name],
+                    price_index=self.price_indexes[name],
+                    policies=self.policies
+                )
 
+        return self._concat_handlers(names)
+
+    def _stream_total(self, names):
+        # totals come from every row, not from the CAs, so that the
+        # Total vs Total (CA) check in the resumo geral stays meaningful
+        total = 0.0
+        for name in names:
+            handler = self.data_handlers[name]
+            for _ in handler.load_chunks(self.engine, self.chunksize):
+                if not handler.dataframe.empty:
+                    handler.prepare(
+                        config=self.data_config[name],
+                        price_index=self.price_indexes[name],
+                        policies=self.policies
+                    )
+                if handler.total_column in handler.dataframe.columns:
+                    total += handler.dataframe[handler.total_column].sum()
+            handler.release()
+        return total
+
+    def _stream_cas(self):
+        # ask about unpriced items once, not once per CA
+        for name, handler in self.data_handlers.items():
+            handler.check_prices(
+                self.engine,
+                self.data_config[name],
+                self.price_indexes[name],
+                policies=self.policies
+            )
+
+        self.total = self._stream_total(self.medicao_names)
+        self.total_combustivel = self._stream_total(self.combustivel_names)
+
+        medicao_cas = set()
+        for name in self.medicao_names:
+            source = self._source_column(name, 'ca')
+            medicao_cas.update(
+                self.data_handlers[name].load_distinct(self.engine, [source])
+                [source].dropna()
+            )
+        medicao_cas = sorted(medicao_cas)
+
+        ca_placa_map = {}
         if self.combustivel_names:
-            self._split_ca_com_combustivel()
-        else:
-            self._split_ca_sem_combustivel()
+            placa_info_df = pd.concat([
+                self.data_handlers[name].load_distinct(
+                    self.engine, ['placa', 'prefixo_marca']
+                )
+                for name in self.combustivel_names
+            ], sort=False)
+            placa_info_df = placa_info_df.loc[placa_info_df['placa'].notnull()]
+
+            ca_placa_map, placa_ca_map, missing_medicao = \
+                self._resolve_placas(placa_info_df, medicao_cas)
+
+            if missing_medicao:
+                unassigned = self._load_partition(
+                    self.combustivel_names, 'placa', missing_medicao
+                )
+                self.unproductive = self._unproductive(
+                    unassigned, placa_ca_map, missing_medicao
+                )
+                self._write_unassigned(unassigned)
+            self._defer_placas()
+
+        for ca_code in medicao_cas:
+            ca_medicao = self._load_partition(
+                self.medicao_names, 'ca', ca_code
+            )
+            ca_combustivel = self._load_partition(
+                self.combustivel_names, 'placa', ca_placa_map[ca_code]
+            ) if ca_code in ca_placa_map else pd.DataFrame()
 
+            if ca_medicao.empty:
+                if not ca_combustivel.empty:
+                    # e.g. every row skipped by the unpriced policy
+                    print(
+                        'Warning: no medicao left for {}, its combustivel '
+                        'is reported as unproductive.'.format(ca_code)
+                    )
+                    placas = sorted(ca_combustivel['placa'].unique())
+                    self.unproductive = pd.concat([
+                        self.unproductive,
+                        self._unproductive(
+                            ca_combustivel,
+                            {placa: ca_code for placa in placas},
+                            placas
+                        )
+                    ], ignore_index=True)
+                    self._write_unassigned(ca_combustivel)
+                continue
+
+            yield CA(
+                ca_code, self.period_str, self.observation_str,
+                ca_medicao, ca_combustivel
+            )
+
+    def _export_ca(self, ca, folders):
+        ca.export_sheet(
+            folders['excel'], self.medicao_columns, self.medicao_widths
+        )
+        ca.export_resumo(folders['md'], self.combustivel_columns)
+        self.ca_stats.append(ca.stats())
+
+        if self.parquet and self.streaming:
+            self.parquet.write_ca(ca)
+
+    def _set_parquet_schemas(self):
+        for dataset, names, handler_type in [
+            ('medicao', self.medicao_names, MedicaoSQL),
+            ('combustivel', self.combustivel_names, CombustivelSQL)
+        ]:
+            self.parquet.set_sql_schema(
+                dataset,
+                self.engine,
+                [
+                    (self.data_config[name]['table'],
+                     self.data_config[name]['rename'])
+                    for name in names
+                ],
+                handler_type.computed_columns
+            )
+
+    def _write_unassigned(self, combustivel_df):
+        # fuel not attached to an exported CA, so the dataset adds up to
+        # the Total combustivel of the resumo geral
+        if self.parquet and not combustivel_df.empty:
+            self.parquet.write(
+                'combustivel', combustivel_df.assign(ca=UNASSIGNED_CA)
+            )
+
+    def _write_aggregated(self):
+        self.parquet.write('medicao', self.medicao_df)
+
+        if self.combustivel_df.empty:
+            return
+
+        attached = {
+            placa: ca.ca
+            for ca in self.ca_list if not ca.combustivel_df.empty
+            for placa in ca.combustivel_df['placa'].unique()
+        }
+        self.parquet.write('combustivel', self.combustivel_df.assign(
+            ca=self.combustivel_df['placa'].map(attached)
+            .fillna(UNASSIGNED_CA)
+        ))
+
+    def mount(self):
         folders = {
             'excel': 'CA/Partes diárias - EXCEL',
             'pdf': 'CA/Partes diárias - PDF',
@@ -362,17 +669,45 @@ class MountSQL:
         for folder in folders.values():
             os.makedirs(folder, exist_ok=True)
 
-        progress_bar = tqdm(
-            self.ca_list,
-            ascii=True,
-            desc='Exporting sheets and markdowns',
-            bar_format='{desc}... {percentage:3.0f}% [{bar}]'
-        )
-        for ca in progress_bar:
-            ca.export_sheet(
-                folders['excel'], self.medicao_columns, self.medicao_widths
+        if self.parquet:
+            self._set_parquet_schemas()
+            self.parquet.clear()
+
+        if self.streaming:
+            # only the current CA is held in memory, plus running totals
+            for ca in tqdm(
+                self._stream_cas(),
+                ascii=True,
+                desc='Exporting sheets and markdowns',
+                bar_format='{desc}... {n_fmt} CAs'
+            ):
+                self._export_ca(ca, folders)
+        else:
+            self._aggregate()
+
+            if self.combustivel_names:
+                self._split_ca_com_combustivel()
+            else:
+                self._split_ca_sem_combustivel()
+
+            self.total = self.medicao_df['valor_total'].sum()
+            self.total_combustivel = self.combustivel_df['total'].sum() \
+                if not self.combustivel_df.empty else 0.0
+
+            progress_bar = tqdm(
+                self.ca_list,
+                ascii=True,
+                desc='Exporting sheets and markdowns',
+                bar_format='{desc}... {percentage:3.0f}% [{bar}]'
             )
-            ca.export_resumo(folders['md'], self.combustivel_columns)
+            for ca in progress_bar:
+                self._export_ca(ca, folders)
+
+            if self.parquet:
+                self._write_aggregated()
+
+        if self.parquet:
+            self.parquet.write_totals(self.unproductive, self.ca_stats)
 
         progress_bar = tqdm(
             [
@@ -407,28 +742,23 @@ class MountSQL:
             silent(command)
 
     def export_resumo_geral(self):
-        total = self.medicao_df['valor_total'].sum()
-        total_combustivel = self.combustivel_df['total'].sum()
+        total = self.total
+        total_combustivel = self.total_combustivel
 
-        stats = [ca.stats() for ca in self.ca_list]
+        stats = self.ca_stats
         total_ca = sum(stat['total_carga_bruta'] for stat in stats)
         total_combustivel_ca = sum(stat['total_combustivel'] for stat in stats)
 
-        liquido_df = self.medicao_df[['ca']].drop_duplicates()
-        liquido_df['cod'] = liquido_df['ca'].apply(
+        liquido_df = pd.DataFrame(
+            [(stat['ca'], stat['liquido']) for stat in stats],
+            columns=['CA', 'Total a receber']
+        )
+        liquido_df['cod'] = liquido_df['CA'].apply(
             func=lambda x: int(re.sub("[^0-9]", "", x))
             )
-        liquido_df = liquido_df.set_index('cod')
-        liquido_df = liquido_df.sort_index()
-
-        liquido_df = liquido_df.rename(columns={'ca': 'CA'})
-        liquido_df = liquido_df.set_index('CA', drop=False)
-        liquido_df['Total a receber'] = np.nan
-        total_liquido = 0.0
-
-        for stat in stats:
-            liquido_df.loc[stat['ca'], 'Total a receber'] = stat['liquido']
-            total_liquido += stat['liquido']
+        liquido_df = liquido_df.sort_values('cod')
+        liquido_df = liquido_df[['CA', 'Total a receber']]
+        total_liquido = liquido_df['Total a receber'].sum()
 
         with open('Resumo_geral.txt', 'w') as resumo:
             resumo.write(
@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+
+import os
+import shutil
+from urllib.parse import unquote
+
+import pandas as pd
+import sqlalchemy
+
+
+# arrow types by name, so callers don't need to import pyarrow
+ARROW_TYPES = {
+    'string': lambda pa: pa.string(),
+    'double': lambda pa: pa.float64(),
+    'bool': lambda pa: pa.bool_(),
+    'date': lambda pa: pa.date32(),
+    'timestamp': lambda pa: pa.timestamp('ns'),
+}
+
+FIXED_COLUMNS = {
+    'unproductive': {'CA': 'string', 'Placa': 'string', 'Total': 'double'},
+    'stats': {
+        'ca': 'string',
+        'total_carga_bruta': 'double',
+        'total_combustivel': 'double',
+        'liquido': 'double',
+    },
+}
+
+
+def sql_type_name(sql_type):
+    # every number is a double: pandas reads nullable integers as floats
+    if isinstance(sql_type, (sqlalchemy.types.Integer,
+                             sqlalchemy.types.Numeric,
+                             sqlalchemy.types.Float)):
+        return 'double'
+    if isinstance(sql_type, sqlalchemy.types.Boolean):
+        return 'bool'
+    if isinstance(sql_type, sqlalchemy.types.DateTime):
+        return 'timestamp'
+    if isinstance(sql_type, sqlalchemy.types.Date):
+        return 'date'
+    return 'string'
+
+
+class ParquetExporter:
+    """Writes the mounted data as hive-partitioned Parquet datasets.
+
+    Every dataset is partitioned by the global filter columns (the period)
+    and, where it makes sense, by CA, e.g. medicao/period=.../ca=.../.
+    Each dataset is written with one fixed schema, so fragments written
+    separately (e.g. one per CA) can always be read back together.
+    """
+
+    def __init__(self, root, filters):
+        try:
+            import pyarrow
+        except ImportError:
+            raise ImportError('Parquet output requires pyarrow.')
+
+        self.pa = pyarrow
+        self.root = root
+        self.filters = filters
+        self.schemas = {}
+
+        for dataset, columns in FIXED_COLUMNS.items():
+            self.set_schema(dataset, columns)
+
+    def set_schema(self, dataset, columns):
+        columns = dict(columns)
+        columns.update({col: 'string' for col in self.filters})
+        self.schemas[dataset] = self.pa.schema([
+            (col, ARROW_TYPES[type_name](self.pa))
+            for col, type_name in columns.items()
+        ])
+
+    def set_sql_schema(self, dataset, engine, tables, computed):
+        """Schema from the columns of the SQL tables behind a dataset.
+
+        tables holds (table, rename) pairs and computed the type names of
+        the columns prepare adds or converts, before renaming. The ca
+        partition column is always a string.
+        """
+        inspector = sqlalchemy.inspect(engine)
+
+        columns = {}
+        for table, rename in tables:
+            for col in inspector.get_columns(table):
+                columns.setdefault(
+                    rename.get(col['name'], col['name']),
+                    sql_type_name(col['type'])
+                )
+            for col, type_name in computed.items():
+                columns[rename.get(col, col)] = type_name
+        columns['ca'] = 'string'
+        self.set_schema(dataset, columns)
+
+    def _partition_dirs(self, dataset):
+        # match on the decoded names, pyarrow URI-encodes partition values
+        paths = [os.path.join(self.root, dataset)]
+        for col, value in self.filters.items():
+            wanted = '{}={}'.format(col, value)
+            paths = [
+                os.path.join(path, entry)
+                for path in paths if os.path.isdir(path)
+                for entry in os.listdir(path) if unquote(entry) == wanted
+            ]
+        return paths
+
+    def clear(self):
+        # remounting a period replaces its partitions instead of appending
+        for dataset in self.schemas:
+            for path in self._partition_dirs(dataset):
+                shutil.rmtree(path)
+
+    def write(self, dataset, df, by_ca=True):
+        if df.empty:
+            return
+
+        schema = self.schemas[dataset]
+        df = df.assign(**{
+            col: value for col, value in self.filters.items()
+            if col not in df.columns
+        })
+        df = df.assign(**{
+            col: pd.Series(None, index=df.index, dtype=object)
+            for col in schema.names if col not in df.columns
+        })[schema.names]
+        partition_cols = list(self.filters) + (['ca'] if by_ca else [])
+
+        df.to_parquet(
+            os.path.join(self.root, dataset),
+            engine='pyarrow',
+            partition_cols=partition_cols,
+            index=False,
+            schema=schema
+        )
+
+    def write_ca(self, ca):
+        self.write('medicao', ca.medicao_df)
+        if not ca.combustivel_df.empty:
+            self.write('combustivel', ca.combustivel_df.assign(ca=ca.ca))
+
+    def write_totals(self, unproductive, stats):
+        self.write('unproductive', unproductive, by_ca=False)
+        self.write('stats', pd.DataFrame(stats), by_ca=False)
@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+
+import pandas as pd
+import sqlalchemy
+
+
+class PlacaCAIndex:
+
+    def __init__(self, tablename='placa_ca'):
+        self.tablename = tablename
+        self.mapping = {}
+        self._new = {}
+
+    def _exists(self, engine):
+        return self.tablename in sqlalchemy.inspect(engine).get_table_names()
+
+    def load(self, engine):
+        # table is created on the first save
+        if not self._exists(engine):
+            self.mapping = {}
+            return
+
+        stored = pd.read_sql_query(
+            'SELECT placa, ca FROM {}'.format(self.tablename), engine
+        )
+
+        self.mapping = dict(zip(stored['placa'], stored['ca']))
+
+    def resolve(self, combustivel_df):
+        """Map every placa of combustivel_df to a CA.
+
+        CA codes are extracted from prefixo_marca for all placas at once,
+        falling back to the stored mappings. Returns the placa -> CA map and
+        the sorted placas that could not be resolved.
+        """
+        info = combustivel_df[['placa', 'prefixo_marca']].drop_duplicates()
+        info['ca'] = info['prefixo_marca'].astype(str) \
+            .str.extract(r'(CA-\d+)', expand=False)
+
+        extracted = info.groupby('placa', sort=True)['ca'].first()
+
+        resolved = {}
+        missing = []
+        for placa, ca in extracted.items():
+            if pd.notnull(ca):
+                resolved[placa] = ca
+            elif placa in self.mapping:
+                resolved[placa] = self.mapping[placa]
+            else:
+                missing.append(placa)
+
+        for placa, ca in resolved.items():
+            if self.mapping.get(placa) != ca:
+                self.confirm(placa, ca)
+
+        return resolved, missing
+
+    def confirm(self, placa, ca):
+        self.mapping[placa] = ca
+        self._new[placa] = ca
+
+    def save(self, engine):
+        if not self._new:
+            return
+
+        new_df = pd.DataFrame(
+            list(self._new.items()), columns=['placa', 'ca']
+        )
+        if self._exists(engine):
+            engine.execute(
+                sqlalchemy.text(
+                    'DELETE FROM {} WHERE placa = :placa'.format(
+                        self.tablename
+                    )
+                ),
+                [{'placa': placa} for placa in self._new]
+            )
+
+        new_df.to_sql(
+            self.tablename,
+            engine,
+            if_exists='append',
+            index=False
+        )
+        self._new = {}
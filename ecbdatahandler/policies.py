@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+
+import sys
+
+from ecbdatahandler.helpers import prompt_yes_no, silent
+
+
+ACTIONS = {
+    'unpriced': ('prompt', 'fail', 'skip', 'default', 'defer'),
+    'unknown_placa': ('prompt', 'fail', 'skip', 'default', 'defer'),
+    'sql_error': ('prompt', 'fail', 'skip', 'defer'),
+}
+
+
+class Policies:
+    """How data anomalies are resolved, from the [policies] section.
+
+    Each option is one of prompt (ask, the default), fail, skip,
+    default:<value> or defer. Deferred items are collected and written
+    together by report at the end of the run.
+    """
+
+    def __init__(self, options=None):
+        options = options or {}
+        for kind in options:
+            if kind not in ACTIONS:
+                raise ValueError("unknown policy: '{}'".format(kind))
+
+        self.options = dict.fromkeys(ACTIONS, 'prompt')
+        self.options.update(options)
+        self.deferred = {}
+        self.confirmed = set()
+
+        for kind in ACTIONS:
+            self.action(kind)
+
+    def action(self, kind):
+        action, _, value = self.options[kind].partition(':')
+        if action not in ACTIONS[kind]:
+            raise ValueError(
+                "invalid policy for {0}: '{1}'".format(kind, action)
+            )
+        if action == 'default' and not value:
+            raise ValueError('policy {0} needs a default value'.format(kind))
+        return action, value
+
+    def confirm(self, message, items=()):
+        # items already confirmed are not asked about again
+        if items and self.confirmed.issuperset(items):
+            return
+
+        print(message)
+        if not prompt_yes_no('Continue?', default='no'):
+            sys.exit(1)
+        print('')
+        self.confirmed.update(items)
+
+    def fail(self, message):
+        print(message)
+        sys.exit(1)
+
+    def defer(self, kind, item, context):
+        # same item may show up once per CA when streaming
+        self.deferred[(kind, str(item), str(context))] = None
+
+    def report(self, filename='Pendencias.txt'):
+        if not self.deferred:
+            return
+
+        with open(filename, 'w') as report:
+            for kind in ACTIONS:
+                items = [
+                    (item, context)
+                    for k, item, context in self.deferred if k == kind
+                ]
+                if not items:
+                    continue
+
+                report.write('{}:\n\n'.format(kind))
+                for item, context in items:
+                    report.write('\t{} ({})\n'.format(item, context))
+                report.write('\n')
+
+        silent('unix2dos {}'.format(filename), silence_stderr=True)
+        print('{} deferred items written to {}.'.format(
+            len(self.deferred), filename
+        ))
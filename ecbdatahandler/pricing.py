@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+
+import numpy as np
+import pandas as pd
+
+
+class PriceIndex:
+
+    def __init__(self, packs, price, null_price_map=None):
+        # later packs override earlier ones, as the per-pack assignments did
+        self.prices = {}
+        for pack, value in price.items():
+            for item in packs[pack]:
+                self.prices[item] = float(value)
+
+        self.null_price_map = {
+            float(k): float(v) for k, v in (null_price_map or {}).items()
+        }
+
+    def resolve(self, items, current_prices):
+        """Return (prices, unpriced, rows) for the whole column in one pass.
+
+        Known items get their pack price, null items have their current
+        price translated through null_price_map and anything else keeps
+        its current price. Those items are listed in unpriced (a null item
+        without a map hit as 'None') and their rows flagged in rows.
+        """
+        categorical = items.astype('category')
+        categories = categorical.cat.categories
+        codes = categorical.cat.codes.values
+
+        lookup = np.array(
+            [self.prices.get(item, np.nan) for item in categories] + [np.nan]
+        )
+        # code -1 (null item) indexes the trailing NaN
+        resolved = pd.Series(lookup[codes], index=items.index)
+
+        current_prices = pd.to_numeric(current_prices, errors='coerce')
+        prices = resolved.where(resolved.notnull(), current_prices)
+
+        unpriced = sorted(
+            str(item) for item, price in zip(categories, lookup)
+            if np.isnan(price)
+        )
+
+        rows = resolved.isnull().values
+
+        null_items = codes == -1
+        if null_items.any():
+            # without a map hit the current price is kept and reported
+            mapped = current_prices.map(self.null_price_map)
+            unmapped = null_items & mapped.isnull().values
+            prices = prices.where(~null_items | unmapped, mapped)
+            rows = rows & (~null_items | unmapped)
+            if unmapped.any():
+                unpriced.append(str(None))
+
+        return prices, unpriced, rows
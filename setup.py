@@ -1,7 +1,6 @@
 #!/usr/bin/env python
 
-from distutils.core import setup
-from setuptools import find_packages
+from setuptools import setup, find_packages
 
 setup(
     name='ecbdatahandler',
@@ -10,5 +9,8 @@ setup(
     author='Celio Passos',
     author_email='celio.passosjr@gmail.com',
     packages=find_packages(where='.', exclude=('virtualenv')),
-    scripts=['bin/ecbdatahandler']
+    scripts=['bin/ecbdatahandler'],
+    # general.parquet in the mount info file; pyarrow 0.17 to 1.0 match
+    # the pinned pandas 1.0.5 and numpy 1.19
+    extras_require={'parquet': ['pyarrow>=0.17,<2']}
 )